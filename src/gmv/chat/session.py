@@ -6,8 +6,10 @@ import json
 import os
 import subprocess
 import sys
+from contextlib import closing
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Mapping, Optional, Tuple
 
@@ -31,6 +33,7 @@ class ChatRunResult:
     audit_log: str
 
 
+@lru_cache(maxsize=1)
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[3]
 
@@ -46,6 +49,9 @@ def _utc_stamp() -> str:
 def _tail_text(text: str, *, max_lines: int = 200, max_bytes: int = 20_000) -> str:
     if not text:
         return ""
+    # Every character is at least one UTF-8 byte, so the last `max_bytes` characters
+    # already cover the byte window; don't encode a multi-MB tool output in full.
+    text = text[-max_bytes:]
     data = text.encode("utf-8", errors="replace")
     if len(data) > max_bytes:
         data = data[-max_bytes:]
@@ -56,16 +62,30 @@ def _tail_text(text: str, *, max_lines: int = 200, max_bytes: int = 20_000) -> s
     return "\n".join(lines)
 
 
-def _write_audit_line(path: Path, payload: Mapping[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as fh:
-        fh.write(json.dumps(payload, ensure_ascii=False) + "\n")
+class _AuditLog:
+    """Append-only JSONL audit log kept open for the whole session.
 
+    Line-buffered, so every entry still reaches disk as soon as it is written.
+    """
 
-def _write_artifact(dir_path: Path, name: str, content: str) -> str:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = path.open("a", encoding="utf-8", buffering=1)
+
+    def write(self, payload: Mapping[str, Any]) -> None:
+        self._fh.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _write_artifact(dir_path: Path, name: str, *chunks: str) -> str:
+    # Chunks are written in order, so large tool outputs are never concatenated
+    # into one more in-memory copy just to be saved.
     dir_path.mkdir(parents=True, exist_ok=True)
     output = dir_path / name
-    output.write_text(content, encoding="utf-8", errors="replace")
+    with output.open("w", encoding="utf-8", errors="replace") as fh:
+        fh.writelines(chunks)
     return str(output)
 
 
@@ -78,7 +98,8 @@ def _confirm(prompt: str) -> bool:
 
 
 def _run_argv(argv: List[str], *, cwd: Path) -> Tuple[int, str, str]:
-    proc = subprocess.run(argv, cwd=str(cwd), env=os.environ, capture_output=True, text=True, check=False)
+    # env is inherited; passing os.environ explicitly only forces a copy of it per spawn.
+    proc = subprocess.run(argv, cwd=str(cwd), capture_output=True, text=True, check=False)
     return int(proc.returncode), str(proc.stdout or ""), str(proc.stderr or "")
 
 
@@ -238,11 +259,20 @@ def _execute_tool(
 
     if tool_name == "show_latest_snakemake_log":
         log_dir = repo_root / ".snakemake" / "log"
-        logs = sorted(log_dir.glob("*.snakemake.log")) if log_dir.exists() else []
-        if not logs:
+        # Log names start with an ISO timestamp, so the lexicographic max is the latest.
+        # scandir's DirEntry answers is_file() from readdir data (no stat per log).
+        latest_name: Optional[str] = None
+        if log_dir.is_dir():
+            with os.scandir(log_dir) as it:
+                latest_name = max(
+                    (e.name for e in it if e.name.endswith(".snakemake.log") and e.is_file()),
+                    default=None,
+                )
+        if latest_name is None:
             output = f"ERROR: no snakemake logs found under {log_dir}"
             return ToolResult(1, _tail_text(output), "", [], output)
-        output = f"==> {logs[-1]}\n" + _tail_file(logs[-1], lines=int(clean.get("lines", 200)))
+        latest = log_dir / latest_name
+        output = f"==> {latest}\n" + _tail_file(latest, lines=int(clean.get("lines", 200)))
         return ToolResult(0, _tail_text(output), "", [], output)
 
     argv = _build_argv(tool_name, clean, config_path=config_path)
@@ -255,8 +285,11 @@ def _execute_tool(
         return ToolResult(0, _tail_text(text), "", [artifact], text)
 
     rc, stdout, stderr = _run_argv(argv, cwd=repo_root)
-    artifact_content = f"argv={argv}\n\n--- stdout ---\n{stdout}\n\n--- stderr ---\n{stderr}\n"
-    artifact = _write_artifact(artifacts_dir, f"tool.{_utc_stamp()}.{tool_name}.log.txt", artifact_content)
+    artifact = _write_artifact(
+        artifacts_dir,
+        f"tool.{_utc_stamp()}.{tool_name}.log.txt",
+        f"argv={argv}\n\n--- stdout ---\n", stdout, "\n\n--- stderr ---\n", stderr, "\n",
+    )
     return ToolResult(
         rc,
         _tail_text(stdout),
@@ -306,107 +339,109 @@ def run_chat(
     session_dir.mkdir(parents=True, exist_ok=True)
 
     audit_file = session_dir / f"chat.{_utc_stamp()}.jsonl"
-    messages: List[Dict[str, Any]] = [{"role": "system", "content": _system_prompt()}]
-    _write_audit_line(audit_file, {"timestamp": _utc_iso(), "role": "system", "content": messages[0]["content"]})
+    with closing(_AuditLog(audit_file)) as audit:
+        messages: List[Dict[str, Any]] = [{"role": "system", "content": _system_prompt()}]
+        audit.write({"timestamp": _utc_iso(), "role": "system", "content": messages[0]["content"]})
 
-    mock_mode = os.environ.get("GMV_CHAT_MOCK", "").strip() == "1"
-    dry_run_tools = mock_mode or os.environ.get("GMV_CHAT_DRY_RUN_TOOLS", "").strip() == "1"
+        mock_mode = os.environ.get("GMV_CHAT_MOCK", "").strip() == "1"
+        dry_run_tools = mock_mode or os.environ.get("GMV_CHAT_DRY_RUN_TOOLS", "").strip() == "1"
 
-    settings: Optional[LLMConfig] = None
-    if not mock_mode:
-        settings = load_llm_config(base_url=base_url, model=model, api_key_env=api_key_env, llm_config=llm_config)
+        settings: Optional[LLMConfig] = None
+        if not mock_mode:
+            settings = load_llm_config(base_url=base_url, model=model, api_key_env=api_key_env, llm_config=llm_config)
 
-    tools = openai_tools()
+        tools = openai_tools()
 
-    def handle_turn(user_text: str, *, interactive: bool) -> int:
-        messages.append({"role": "user", "content": user_text})
-        _write_audit_line(audit_file, {"timestamp": _utc_iso(), "role": "user", "content": user_text})
+        def handle_turn(user_text: str, *, interactive: bool) -> int:
+            messages.append({"role": "user", "content": user_text})
+            audit.write({"timestamp": _utc_iso(), "role": "user", "content": user_text})
 
-        for _ in range(max_steps):
-            assistant_text, tool_calls = _assistant_response(
-                messages,
-                config_path=config_path,
-                settings=settings,
-                tools=tools,
-                mock_mode=mock_mode,
-            )
-
-            msg_payload: Dict[str, Any] = {"role": "assistant", "content": assistant_text}
-            if tool_calls:
-                msg_payload["tool_calls"] = tool_calls
-            messages.append(msg_payload)
-            _write_audit_line(audit_file, {"timestamp": _utc_iso(), "role": "assistant", "content": assistant_text, "tool_calls": tool_calls})
-
-            if assistant_text:
-                print(assistant_text)
-            if not tool_calls:
-                return 0
-
-            for call in tool_calls:
-                fn = call.get("function") if isinstance(call.get("function"), dict) else {}
-                tool_name = str(fn.get("name") or "")
-                raw_args = fn.get("arguments") or "{}"
-                try:
-                    parsed_args = json.loads(raw_args) if isinstance(raw_args, str) else dict(raw_args)
-                except Exception:
-                    parsed_args = {}
-
-                result = _execute_tool(
-                    tool_name=tool_name,
-                    args=parsed_args,
+            for _ in range(max_steps):
+                assistant_text, tool_calls = _assistant_response(
+                    messages,
                     config_path=config_path,
-                    auto_approve=auto_approve,
-                    interactive=interactive,
-                    dry_run_tools=dry_run_tools,
-                    artifacts_dir=session_dir,
-                )
-
-                summary = _render_tool_result(tool_name, result)
-                print(summary)
-                _write_audit_line(
-                    audit_file,
-                    {
-                        "timestamp": _utc_iso(),
-                        "role": "tool",
-                        "content": summary,
-                        "tool_name": tool_name,
-                        "tool_args": parsed_args,
-                        "returncode": result.returncode,
-                        "stdout_tail": result.stdout_tail,
-                        "stderr_tail": result.stderr_tail,
-                        "artifact_paths": result.artifact_paths,
-                    },
+                    settings=settings,
+                    tools=tools,
+                    mock_mode=mock_mode,
                 )
 
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": str(call.get("id") or ""),
-                        "name": tool_name,
-                        "content": result.content_for_llm,
-                    }
+                msg_payload: Dict[str, Any] = {"role": "assistant", "content": assistant_text}
+                if tool_calls:
+                    msg_payload["tool_calls"] = tool_calls
+                messages.append(msg_payload)
+                audit.write(
+                    {"timestamp": _utc_iso(), "role": "assistant", "content": assistant_text, "tool_calls": tool_calls}
                 )
 
-                if result.returncode == 3 and not auto_approve and not interactive:
-                    return 3
-
-        return 1
-
-    if message is not None:
-        rc = handle_turn(message, interactive=False)
-        return ChatRunResult(returncode=rc, audit_log=str(audit_file))
-
-    print("GMV ChatOps (输入 exit/quit 退出)")
-    while True:
-        try:
-            user_text = input("gmv> ").strip()
-        except EOFError:
-            print("")
-            break
-        if not user_text:
-            continue
-        if user_text.lower() in {"exit", "quit"}:
-            break
-        _ = handle_turn(user_text, interactive=True)
-
-    return ChatRunResult(returncode=0, audit_log=str(audit_file))
+                if assistant_text:
+                    print(assistant_text)
+                if not tool_calls:
+                    return 0
+
+                for call in tool_calls:
+                    fn = call.get("function") if isinstance(call.get("function"), dict) else {}
+                    tool_name = str(fn.get("name") or "")
+                    raw_args = fn.get("arguments") or "{}"
+                    try:
+                        parsed_args = json.loads(raw_args) if isinstance(raw_args, str) else dict(raw_args)
+                    except Exception:
+                        parsed_args = {}
+
+                    result = _execute_tool(
+                        tool_name=tool_name,
+                        args=parsed_args,
+                        config_path=config_path,
+                        auto_approve=auto_approve,
+                        interactive=interactive,
+                        dry_run_tools=dry_run_tools,
+                        artifacts_dir=session_dir,
+                    )
+
+                    summary = _render_tool_result(tool_name, result)
+                    print(summary)
+                    audit.write(
+                        {
+                            "timestamp": _utc_iso(),
+                            "role": "tool",
+                            "content": summary,
+                            "tool_name": tool_name,
+                            "tool_args": parsed_args,
+                            "returncode": result.returncode,
+                            "stdout_tail": result.stdout_tail,
+                            "stderr_tail": result.stderr_tail,
+                            "artifact_paths": result.artifact_paths,
+                        },
+                    )
+
+                    messages.append(
+                        {
+                            "role": "tool",
+                            "tool_call_id": str(call.get("id") or ""),
+                            "name": tool_name,
+                            "content": result.content_for_llm,
+                        }
+                    )
+
+                    if result.returncode == 3 and not auto_approve and not interactive:
+                        return 3
+
+            return 1
+
+        if message is not None:
+            rc = handle_turn(message, interactive=False)
+            return ChatRunResult(returncode=rc, audit_log=str(audit_file))
+
+        print("GMV ChatOps (输入 exit/quit 退出)")
+        while True:
+            try:
+                user_text = input("gmv> ").strip()
+            except EOFError:
+                print("")
+                break
+            if not user_text:
+                continue
+            if user_text.lower() in {"exit", "quit"}:
+                break
+            _ = handle_turn(user_text, interactive=True)
+
+        return ChatRunResult(returncode=0, audit_log=str(audit_file))
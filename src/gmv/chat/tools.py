@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Mapping, Optional
 
+_SHELL_META_RE = re.compile(r"[;|><&]")
+
 
 def _safe_token(name: str, value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
     text = str(value)
-    if any(ch in text for ch in [";", "|", ">", "<", "&"]):
+    # One compiled character-class scan instead of a substring test per metacharacter.
+    if _SHELL_META_RE.search(text):
         raise ValueError(f"不安全参数: {name} 包含 shell 元字符: {text!r}")
     return text
 
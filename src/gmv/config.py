@@ -11,6 +11,7 @@ import csv
 import os
 from copy import deepcopy
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Iterable, Mapping, Optional
 
@@ -52,6 +53,7 @@ _PIPELINE_DEFAULTS = {
         "use_singularity": True,
         "offline": True,
         "mock_mode": False,
+        "step_profile": False,
     },
     "containers": {
         "mapping_file": "config/containers.yaml",
@@ -90,6 +92,8 @@ _PIPELINE_DEFAULTS = {
     "database": {},
 }
 
+_CLUSTER_TOOLS = {"vclust", "mmseqs"}
+
 _LLM_DEFAULTS = {
     "base_url": "https://api.openai.com/v1",
     "model": "gpt-4o-mini",
@@ -99,11 +103,28 @@ _LLM_DEFAULTS = {
 }
 
 
+# libyaml-backed loader when PyYAML was built with it; same SafeLoader semantics.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=32)
+def _parse_yaml_file(path: str, mtime_ns: int, size: int) -> Any:
+    # Keyed on (path, mtime_ns, size) so an edited file is re-parsed, while the
+    # repeated loads of one config (validate/run/chat in one process) hit the cache.
+    with open(path, "rb") as fh:
+        return yaml.load(fh, Loader=_YAML_LOADER)
+
+
+def _load_yaml(path: Path) -> Any:
+    st = path.stat()
+    # Callers may mutate the result; never hand out the cached object itself.
+    return deepcopy(_parse_yaml_file(str(path), st.st_mtime_ns, st.st_size))
+
+
 def _read_yaml(path: Path) -> Dict[str, Any]:
     if not path.exists():
         raise ConfigError(f"配置文件不存在: {path}")
-    with path.open("r", encoding="utf-8") as fh:
-        data = yaml.safe_load(fh) or {}
+    data = _load_yaml(path) or {}
     if not isinstance(data, dict):
         raise ConfigError(f"配置文件必须是字典结构: {path}")
     return data
@@ -112,8 +133,7 @@ def _read_yaml(path: Path) -> Dict[str, Any]:
 def _read_yaml_optional(path: Path) -> Dict[str, Any]:
     if not path.exists():
         return {}
-    with path.open("r", encoding="utf-8") as fh:
-        data = yaml.safe_load(fh) or {}
+    data = _load_yaml(path) or {}
     return data if isinstance(data, dict) else {}
 
 
@@ -227,6 +247,12 @@ def load_pipeline_config(config_path: str | Path) -> Dict[str, Any]:
     enabled_tools = cfg.get("tools", {}).get("enabled", {}) or {}
     has_host = _has_host_samples(sample_sheet)
 
+    cluster_tool = str((cfg.get("tools", {}).get("params", {}) or {}).get("viruslib_cluster_tool", "vclust"))
+    if cluster_tool not in _CLUSTER_TOOLS:
+        raise ConfigError(
+            f"tools.params.viruslib_cluster_tool 不支持: {cluster_tool}（允许: {sorted(_CLUSTER_TOOLS)}）"
+        )
+
     if use_singularity:
         required_images = {
             "fastp",
@@ -234,8 +260,8 @@ def load_pipeline_config(config_path: str | Path) -> Dict[str, Any]:
             "vsearch",
             "checkv",
             "busco",
-            "vclust",
             "coverm",
+            cluster_tool,
         }
         if bool(enabled_tools.get("virsorter", False)):
             required_images.add("virsorter")
@@ -5,21 +5,19 @@ import csv
 import json
 from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 from gmv.reporting.plots import write_bar_svg
 
 
-def _read_decisions(decisions_file: Path) -> List[dict]:
+def _iter_decisions(decisions_file: Path) -> Iterator[dict]:
     if not decisions_file.exists():
-        return []
-    rows = []
+        return
     with decisions_file.open("r", encoding="utf-8") as fh:
         for line in fh:
             line = line.strip()
             if line:
-                rows.append(json.loads(line))
-    return rows
+                yield json.loads(line)
 
 
 def generate_report(results_dir: str | Path, reports_dir: str | Path, run_id: str) -> Dict[str, str]:
@@ -34,10 +32,25 @@ def generate_report(results_dir: str | Path, reports_dir: str | Path, run_id: st
     table_dir.mkdir(parents=True, exist_ok=True)
 
     decisions_file = results / run_id / "agent" / "decisions.jsonl"
-    decisions = _read_decisions(decisions_file)
 
-    action_counter = Counter(d.get("action", "unknown") for d in decisions)
-    risk_counter = Counter(d.get("risk_level", "unknown") for d in decisions)
+    # One pass over decisions.jsonl: rows go straight to the table while the
+    # action/risk histograms are accumulated, without holding the log in memory.
+    action_counter: Counter[str] = Counter()
+    risk_counter: Counter[str] = Counter()
+    table_file = table_dir / "agent_decisions.tsv"
+    with table_file.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh, delimiter="\t")
+        writer.writerow(["step", "risk_level", "action", "auto_applied", "timestamp"])
+        for d in _iter_decisions(decisions_file):
+            action_counter[d.get("action", "unknown")] += 1
+            risk_counter[d.get("risk_level", "unknown")] += 1
+            writer.writerow([
+                d.get("step", ""),
+                d.get("risk_level", ""),
+                d.get("action", ""),
+                d.get("auto_applied", ""),
+                d.get("timestamp", ""),
+            ])
 
     action_data: List[Tuple[str, float]] = [(k, float(v)) for k, v in sorted(action_counter.items())]
     risk_data: List[Tuple[str, float]] = [(k, float(v)) for k, v in sorted(risk_counter.items())]
@@ -58,19 +71,6 @@ def generate_report(results_dir: str | Path, reports_dir: str | Path, run_id: st
         data=risk_data or [("low", 0.0)],
     )
 
-    table_file = table_dir / "agent_decisions.tsv"
-    with table_file.open("w", encoding="utf-8", newline="") as fh:
-        writer = csv.writer(fh, delimiter="\t")
-        writer.writerow(["step", "risk_level", "action", "auto_applied", "timestamp"])
-        for d in decisions:
-            writer.writerow([
-                d.get("step", ""),
-                d.get("risk_level", ""),
-                d.get("action", ""),
-                d.get("auto_applied", ""),
-                d.get("timestamp", ""),
-            ])
-
     methods_file = manuscript_dir / "methods_zh.md"
     methods_file.write_text(
         "\n".join(
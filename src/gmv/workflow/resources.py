@@ -97,6 +97,14 @@ DEFAULT_TOOL_ESTIMATES: dict[str, dict[str, int]] = {
         "mem_mb_max": 192000,
         "runtime_max": 72 * 60,
     },
+    "mmseqs": {
+        "mem_mb_base": 8000,
+        "mem_mb_per_gb": 1500,
+        "runtime_base": 30,
+        "runtime_per_gb": 10,
+        "mem_mb_max": 192000,
+        "runtime_max": 24 * 60,
+    },
     # Project-wide downstream (single job).
     "coverm": {
         "mem_mb_base": 16000,
@@ -3,6 +3,12 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import os
+import resource
+import sys
+import time
+from pathlib import Path
 
 from gmv.workflow.steps.agent import register_agent
 from gmv.workflow.steps.project import register_project
@@ -20,11 +26,57 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+PROFILE_HEADER = "stage\twall_s\tcpu_s\tpeak_rss_gb\tcmd_hash\n"
+
+
+def init_profile(path: str) -> None:
+    """Create the step profile TSV with its header, unless it already exists.
+
+    O_EXCL makes creation atomic, so exactly one caller writes the header. The
+    Snakefile calls this once in `onstart`, before any step job can append.
+    """
+
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(out, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(PROFILE_HEADER)
+
+
+def _append_profile_row(path: str, step: str, wall_s: float, start: tuple[float, float]) -> None:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_s = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime - sum(start)
+    # ru_maxrss is KiB on Linux; the children value is the largest single tool process.
+    peak_rss_gb = max(own.ru_maxrss, children.ru_maxrss) / (1024.0 * 1024.0)
+    cmd_hash = hashlib.blake2b("\0".join(sys.argv[1:]).encode("utf-8"), digest_size=8).hexdigest()
+
+    # Standalone runs (no Snakefile onstart) still get exactly one header.
+    init_profile(path)
+    # One short O_APPEND write per step, so concurrent jobs do not interleave rows.
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(f"{step}\t{wall_s:.2f}\t{cpu_s:.2f}\t{peak_rss_gb:.3f}\t{cmd_hash}\n")
+
+
 def main() -> int:
     parser = build_parser()
     args = parser.parse_args()
+
+    profile_path = os.environ.get("GMV_STEP_PROFILE", "").strip()
+    if not profile_path:
+        args.func(args)
+        return 0
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start_cpu = (own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime)
+    start_wall = time.perf_counter()
     args.func(args)
+    _append_profile_row(profile_path, args.step, time.perf_counter() - start_wall, start_cpu)
     return 0
 
 
-__all__ = ["build_parser", "main"]
+__all__ = ["build_parser", "init_profile", "main"]
@@ -2,24 +2,100 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
+import shlex
+import shutil
 import subprocess
+import sys
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 
 
 def copy_file(src: str, dst: str) -> None:
+    # shutil.copyfile streams via os.sendfile on Linux (chunked copy elsewhere),
+    # so multi-GB reads/contigs never have to fit in memory.
     Path(dst).parent.mkdir(parents=True, exist_ok=True)
-    Path(dst).write_bytes(Path(src).read_bytes())
+    shutil.copyfile(src, dst)
 
 
-def run_shell(cmd: str) -> None:
-    proc = subprocess.run(cmd, shell=True, check=False)
+def link_or_copy(src: str, dst: str) -> None:
+    # Pass-through outputs are byte-identical to their input: a hard link costs no
+    # I/O or disk space. Different filesystems (EXDEV) or no link support -> copy.
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        copy_file(src, dst)
+
+
+def move_file(src: str, dst: str) -> None:
+    # Tool workdirs are scratch space: rename the final artifact into place instead
+    # of re-reading and re-writing it (shutil.move only copies across filesystems).
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(src, dst)
+
+
+def run_cmd(argv: Sequence[object]) -> None:
+    # argv list, no /bin/sh: paths with spaces survive and there is no shell to fork.
+    cmd = [str(arg) for arg in argv]
+    cmdline = shlex.join(cmd)
+    print(f"[gmv] 运行: {cmdline}", file=sys.stderr, flush=True)
+    proc = subprocess.run(cmd, check=False)
     if proc.returncode != 0:
-        raise RuntimeError(f"命令失败: {cmd}")
+        raise RuntimeError(f"命令失败: {cmdline}")
 
 
-def read_fasta(path: str) -> List[Tuple[str, str]]:
-    entries: List[Tuple[str, str]] = []
+def cache_key(inputs: Iterable[str | Path], argv: Sequence[object]) -> str:
+    """Fingerprint a tool invocation by its inputs' (path, size, mtime) and argv."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(str(p) for p in inputs):
+        st = os.stat(path)
+        digest.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    digest.update("\0".join(str(arg) for arg in argv).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def run_cmd_cached(
+    argv: Sequence[object],
+    *,
+    stage: str,
+    workdir: str | Path,
+    inputs: Iterable[str | Path],
+    outputs: Iterable[str | Path],
+    force: bool = False,
+) -> bool:
+    """Run `argv` unless the last completed `stage` run in `workdir` was identical.
+
+    One `.done.<stage>` sentinel per stage records the cache key of the run that
+    produced the current outputs; the run is skipped only when that key matches and
+    every expected output is still present. Returns True if the command actually ran.
+    """
+
+    key = cache_key(inputs, argv)
+    sentinel = Path(workdir) / f".done.{stage}"
+    expected = [Path(p) for p in outputs]
+    if not force and all(p.exists() for p in expected):
+        try:
+            if sentinel.read_text(encoding="utf-8").strip() == key:
+                return False
+        except FileNotFoundError:
+            pass
+    # Invalidate first: outputs are shared by every parameter set, so a failed or
+    # interrupted run must not leave an earlier run's key next to partial outputs.
+    sentinel.unlink(missing_ok=True)
+    run_cmd(argv)
+    sentinel.parent.mkdir(parents=True, exist_ok=True)
+    sentinel.write_text(key + "\n", encoding="utf-8")
+    return True
+
+
+def iter_fasta(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (id, sequence) records one at a time; only the current record is held."""
+
     header = None
     chunks: List[str] = []
     with open(path, "r", encoding="utf-8") as fh:
@@ -27,14 +103,17 @@ def read_fasta(path: str) -> List[Tuple[str, str]]:
             line = line.rstrip("\n")
             if line.startswith(">"):
                 if header is not None:
-                    entries.append((header, "".join(chunks)))
+                    yield header, "".join(chunks)
                 header = line[1:].split()[0]
                 chunks = []
             else:
                 chunks.append(line)
     if header is not None:
-        entries.append((header, "".join(chunks)))
-    return entries
+        yield header, "".join(chunks)
+
+
+def read_fasta(path: str) -> List[Tuple[str, str]]:
+    return list(iter_fasta(path))
 
 
 def write_fasta(path: str, entries: Iterable[Tuple[str, str]]) -> None:
@@ -56,10 +135,12 @@ def write_fasta_filtered(
 
     Path(output_fasta).parent.mkdir(parents=True, exist_ok=True)
     write = False
-    with open(input_fasta, "r", encoding="utf-8") as fin, open(output_fasta, "w", encoding="utf-8") as fout:
+    # Kept lines are copied as raw bytes; only header ids are decoded for the lookup,
+    # so sequence lines never round-trip through str.
+    with open(input_fasta, "rb") as fin, open(output_fasta, "wb") as fout:
         for line in fin:
-            if line.startswith(">"):
-                seq_id = line[1:].strip().split()[0]
+            if line.startswith(b">"):
+                seq_id = line[1:].split(None, 1)[0].decode("utf-8")
                 if keep_ids is not None:
                     write = seq_id in keep_ids
                 elif drop_ids is not None:
@@ -67,6 +148,9 @@ def write_fasta_filtered(
                 else:
                     write = True
             if write:
+                if line.endswith(b"\r\n"):
+                    # Normalize CRLF as the former text-mode copy did.
+                    line = line[:-2] + b"\n"
                 fout.write(line)
 
 
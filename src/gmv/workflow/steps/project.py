@@ -4,61 +4,190 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import os
 import shlex
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
-from gmv.workflow.steps.common import read_fasta, run_shell, write_fasta, write_fasta_filtered
+from gmv.workflow.steps.common import iter_fasta, run_cmd, run_cmd_cached, write_fasta_filtered
 
 
 def step_viruslib_merge(args: argparse.Namespace) -> None:
-    all_entries: List[Tuple[str, str]] = []
-    for fp in args.inputs:
-        path = Path(fp)
-        if not path.exists():
-            continue
-        all_entries.extend(read_fasta(str(path)))
-    renamed = [(f"vOTU{idx}", seq) for idx, (_header, seq) in enumerate(all_entries, start=1)]
-    write_fasta(args.out, renamed)
+    # Index pass: only (length, order, file, offset) per record is kept, not the
+    # sequences, so merging many samples' libraries stays within a small footprint.
+    paths = [str(Path(fp)) for fp in args.inputs if Path(fp).exists()]
+    index: List[Tuple[int, int, int, int]] = []
+    for file_idx, path in enumerate(paths):
+        with open(path, "rb") as fh:
+            offset = -1
+            length = 0
+            pos = 0
+            for line in fh:
+                if line.startswith(b">"):
+                    if offset >= 0:
+                        index.append((-length, len(index), file_idx, offset))
+                    offset = pos
+                    length = 0
+                else:
+                    length += len(line.rstrip(b"\r\n"))
+                pos += len(line)
+            if offset >= 0:
+                index.append((-length, len(index), file_idx, offset))
+
+    # Longest first (stable): greedy clustering then sees each genome before its
+    # fragments, and the first member of a cluster is its longest contig.
+    index.sort()
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    with ExitStack() as stack, open(args.out, "wb") as out:
+        handles = [stack.enter_context(open(path, "rb")) for path in paths]
+        for idx, (_neg_len, _order, file_idx, offset) in enumerate(index, start=1):
+            fh = handles[file_idx]
+            fh.seek(offset)
+            fh.readline()
+            out.write(f">vOTU{idx}\n".encode("ascii"))
+            for line in fh:
+                if line.startswith(b">"):
+                    break
+                out.write(line.rstrip(b"\r\n"))
+            out.write(b"\n")
 
 
 def step_viruslib_dedup(args: argparse.Namespace) -> None:
     if args.mock:
-        representatives: Dict[str, str] = {}
-        cluster_map: List[Tuple[str, str]] = []
-        for header, seq in read_fasta(args.input):
-            if seq not in representatives:
-                representatives[seq] = header
-            cluster_map.append((header, representatives[seq]))
-
-        write_fasta(args.out, [(rep, seq) for seq, rep in representatives.items()])
-        Path(args.clusters).parent.mkdir(parents=True, exist_ok=True)
-        with open(args.clusters, "w", encoding="utf-8") as fh:
-            fh.write("contig\trepresentative\n")
-            for contig, rep in cluster_map:
-                fh.write(f"{contig}\t{rep}\n")
+        # Mock clustering is exact-sequence dedup only.
+        canonical = _dedup_exact(args.input, Path(args.out))
+        _write_clusters(args.clusters, canonical.items())
         return
 
-    temp_dir = Path(args.workdir or (Path(args.clusters).parent / "_vclust"))
+    temp_dir = Path(args.workdir or (Path(args.clusters).parent / f"_{args.cluster_tool}"))
     temp_dir.mkdir(parents=True, exist_ok=True)
 
+    if args.cluster_tool not in {"mmseqs", "vclust"}:
+        raise RuntimeError(f"暂不支持的聚类工具: {args.cluster_tool}")
+
+    # Exact duplicates (the same contig recovered from several samples) are removed
+    # in one hashing pass, so the aligner only ever sees distinct sequences. unique.fa
+    # is rewritten on every run, so the stage caches below stay keyed on args.input.
+    unique_fasta = temp_dir / "unique.fa"
+    canonical = _dedup_exact(args.input, unique_fasta)
+    if args.cluster_tool == "mmseqs":
+        unique_mapping = _cluster_mmseqs(args, temp_dir, unique_fasta)
+    else:
+        unique_mapping = _cluster_vclust(args, temp_dir, unique_fasta)
+
+    rep_of = dict(unique_mapping)
+    mapping = [(contig, rep_of[first]) for contig, first in canonical.items() if first in rep_of]
+    reps = {rep for _contig, rep in mapping}
+    if not reps:
+        raise RuntimeError(f"{args.cluster_tool} 聚类输出为空: {temp_dir}")
+
+    _write_clusters(args.clusters, mapping)
+    write_fasta_filtered(args.input, args.out, keep_ids=reps)
+
+
+def _write_clusters(path: str, mapping: Iterable[Tuple[str, str]]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("contig\trepresentative\n")
+        fh.writelines(f"{contig}\t{rep}\n" for contig, rep in mapping)
+
+
+def _dedup_exact(input_fasta: str, out_fasta: Path) -> Dict[str, str]:
+    """Write the first copy of every distinct sequence to `out_fasta`.
+
+    Returns contig -> first contig carrying the same sequence, in input order.
+    """
+
+    # Streamed: only digest -> first id (and the id mapping) stays in memory, never
+    # the sequences of a multi-GB merged library.
+    first_by_digest: Dict[bytes, str] = {}
+    canonical: Dict[str, str] = {}
+    # Write-then-rename so an interrupted run never leaves a truncated input behind.
+    tmp = out_fasta.with_name(out_fasta.name + ".tmp")
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as out:
+        for header, seq in iter_fasta(input_fasta):
+            digest = hashlib.blake2b(seq.encode("utf-8"), digest_size=16).digest()
+            first = first_by_digest.setdefault(digest, header)
+            canonical[header] = first
+            if first == header:
+                out.write(f">{header}\n{seq}\n")
+    os.replace(tmp, out_fasta)
+    return canonical
+
+
+def _cluster_mmseqs(args: argparse.Namespace, temp_dir: Path, fasta: Path) -> List[Tuple[str, str]]:
+    """Greedy linear-time clustering via `mmseqs easy-linclust`.
+
+    Output `<prefix>_cluster.tsv` is `representative<TAB>member`, one row per member.
+    """
+
+    prefix = temp_dir / "linclust"
+    raw_clusters = temp_dir / "linclust_cluster.tsv"
+    run_cmd_cached(
+        [
+            *shlex.split(args.mmseqs_cmd),
+            "easy-linclust", fasta, prefix, temp_dir / "tmp",
+            "--min-seq-id", float(args.mmseqs_min_seq_id), "-c", float(args.mmseqs_coverage),
+            "--cov-mode", 1, "--threads", int(args.threads),
+        ],
+        stage="linclust",
+        workdir=temp_dir,
+        inputs=[args.input],
+        outputs=[raw_clusters],
+        force=args.force,
+    )
+
+    mapping: List[Tuple[str, str]] = []
+    with raw_clusters.open("r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 2 or not fields[0] or not fields[1]:
+                continue
+            mapping.append((fields[1].strip(), fields[0].strip()))
+    return mapping
+
+
+def _cluster_vclust(args: argparse.Namespace, temp_dir: Path, fasta: Path) -> List[Tuple[str, str]]:
     fltr_file = temp_dir / "fltr.txt"
     ani_file = temp_dir / "ani.tsv"
     raw_clusters = temp_dir / "clusters.raw.tsv"
     ids_file = temp_dir / "ani.ids.tsv"
 
-    run_shell(
-        f"{args.vclust_cmd} prefilter -i {shlex.quote(args.input)} -o {shlex.quote(str(fltr_file))} "
-        f"--min-ident {float(args.min_ident)}"
+    # Each stage is fingerprinted on its inputs, so a rerun after e.g. a failed
+    # `cluster` resumes there instead of repeating prefilter/align.
+    vclust = shlex.split(args.vclust_cmd)
+    run_cmd_cached(
+        [*vclust, "prefilter", "-i", fasta, "-o", fltr_file, "--min-ident", float(args.min_ident)],
+        stage="prefilter",
+        workdir=temp_dir,
+        inputs=[args.input],
+        outputs=[fltr_file],
+        force=args.force,
     )
-    run_shell(
-        f"{args.vclust_cmd} align -i {shlex.quote(args.input)} -o {shlex.quote(str(ani_file))} "
-        f"--filter {shlex.quote(str(fltr_file))}"
+    run_cmd_cached(
+        [*vclust, "align", "-i", fasta, "-o", ani_file, "--filter", fltr_file],
+        stage="align",
+        workdir=temp_dir,
+        inputs=[args.input, fltr_file],
+        outputs=[ani_file, ids_file],
+        force=args.force,
     )
-    run_shell(
-        f"{args.vclust_cmd} cluster -i {shlex.quote(str(ani_file))} -o {shlex.quote(str(raw_clusters))} "
-        f"--ids {shlex.quote(str(ids_file))} --algorithm leiden --metric ani "
-        f"--ani {float(args.ani)} --qcov {float(args.qcov)}"
+    run_cmd_cached(
+        [
+            *vclust,
+            "cluster", "-i", ani_file, "-o", raw_clusters, "--ids", ids_file,
+            "--algorithm", "leiden", "--metric", "ani",
+            "--ani", float(args.ani), "--qcov", float(args.qcov),
+        ],
+        stage="cluster",
+        workdir=temp_dir,
+        inputs=[ani_file, ids_file],
+        outputs=[raw_clusters],
+        force=args.force,
     )
 
     representative_by_cluster: Dict[str, str] = {}
@@ -79,18 +208,7 @@ def step_viruslib_dedup(args: argparse.Namespace) -> None:
                 continue
             representative_by_cluster.setdefault(cluster, contig)
             mapping.append((contig, representative_by_cluster[cluster]))
-
-    reps = set(representative_by_cluster.values())
-    if not reps:
-        raise RuntimeError(f"vclust cluster 输出为空: {raw_clusters}")
-
-    Path(args.clusters).parent.mkdir(parents=True, exist_ok=True)
-    with open(args.clusters, "w", encoding="utf-8") as fh:
-        fh.write("contig\trepresentative\n")
-        for contig, rep in mapping:
-            fh.write(f"{contig}\t{rep}\n")
-
-    write_fasta_filtered(args.input, args.out, keep_ids=reps)
+    return mapping
 
 
 def step_viruslib_annotate(args: argparse.Namespace) -> None:
@@ -102,11 +220,13 @@ def step_viruslib_annotate(args: argparse.Namespace) -> None:
         summary.write_text("votu\tannotation\n", encoding="utf-8")
         return
 
-    cmd = (
-        f"{args.phabox2_cmd} --contigs {shlex.quote(args.input)} --threads {int(args.threads)} "
-        f"--out {shlex.quote(str(out_dir))} --database {shlex.quote(args.db)}"
+    run_cmd(
+        [
+            *shlex.split(args.phabox2_cmd),
+            "--contigs", args.input, "--threads", int(args.threads),
+            "--out", out_dir, "--database", args.db,
+        ]
     )
-    run_shell(cmd)
 
     if not summary.exists():
         summary.write_text("votu\tannotation\n", encoding="utf-8")
@@ -117,11 +237,10 @@ def step_downstream(args: argparse.Namespace) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     if args.mock:
-        sample_ids = [
-            line.strip().split("\t")[0]
-            for line in Path(args.samples).read_text(encoding="utf-8").splitlines()[1:]
-            if line.strip()
-        ]
+        # Only the first column is needed: split once per row instead of on every tab.
+        with open(args.samples, "r", encoding="utf-8") as fh:
+            next(fh, None)
+            sample_ids = [line.strip().split("\t", 1)[0] for line in fh if line.strip()]
         with out_path.open("w", encoding="utf-8") as fh:
             fh.write("sample\tmethod\tcount\n")
             for sample in sample_ids:
@@ -151,14 +270,15 @@ def step_downstream(args: argparse.Namespace) -> None:
     if not coupled:
         raise RuntimeError(f"CoverM 需要 paired reads，但样本表未提供 input1/input2: {sample_sheet}")
 
-    coupled_args = " ".join([shlex.quote(x) for x in coupled])
-    coverm_params = (args.coverm_params or "").strip()
-    cmd = (
-        f"{args.coverm_cmd} contig --coupled {coupled_args} "
-        f"--reference {shlex.quote(args.viruslib)} -t {int(args.threads)} -m count "
-        f"-o {shlex.quote(str(out_path))} {coverm_params}"
-    ).strip()
-    run_shell(cmd)
+    run_cmd(
+        [
+            *shlex.split(args.coverm_cmd),
+            "contig", "--coupled", *coupled,
+            "--reference", args.viruslib, "-t", int(args.threads), "-m", "count",
+            "-o", out_path,
+            *shlex.split(args.coverm_params or ""),
+        ]
+    )
 
 
 def register_project(subparsers: argparse._SubParsersAction[argparse.ArgumentParser]) -> None:
@@ -173,10 +293,15 @@ def register_project(subparsers: argparse._SubParsersAction[argparse.ArgumentPar
     parser.add_argument("--clusters", required=True)
     parser.add_argument("--workdir", default="")
     parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--cluster-tool", choices=["vclust", "mmseqs"], default="vclust")
     parser.add_argument("--vclust-cmd", default="vclust")
+    parser.add_argument("--mmseqs-cmd", default="mmseqs")
     parser.add_argument("--min-ident", type=float, default=0.95)
     parser.add_argument("--ani", type=float, default=0.95)
     parser.add_argument("--qcov", type=float, default=0.85)
+    parser.add_argument("--mmseqs-min-seq-id", type=float, default=0.95)
+    parser.add_argument("--mmseqs-coverage", type=float, default=0.85)
+    parser.add_argument("--force", action="store_true", help="忽略 workdir 中的 .done.* 缓存，强制重跑聚类")
     parser.add_argument("--mock", action="store_true")
     parser.set_defaults(func=step_viruslib_dedup)
 
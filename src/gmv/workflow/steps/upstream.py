@@ -3,11 +3,23 @@
 from __future__ import annotations
 
 import argparse
+import os
 import shlex
+import shutil
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from gmv.workflow.steps.common import copy_file, read_fasta, run_shell, write_fasta, write_fasta_filtered
+from gmv.workflow.steps.common import (
+    copy_file,
+    link_or_copy,
+    move_file,
+    read_fasta,
+    run_cmd,
+    run_cmd_cached,
+    write_fasta,
+    write_fasta_filtered,
+)
 
 
 def step_preprocess(args: argparse.Namespace) -> None:
@@ -15,26 +27,50 @@ def step_preprocess(args: argparse.Namespace) -> None:
         copy_file(args.r1_in, args.r1_out)
         copy_file(args.r2_in, args.r2_out)
         return
-    cmd = (
-        f"{args.fastp_cmd} -i {args.r1_in} -I {args.r2_in} "
-        f"-o {args.r1_out} -O {args.r2_out} -w {args.threads} {args.fastp_params}"
-    ).strip()
-    run_shell(cmd)
+    run_cmd(
+        [
+            *shlex.split(args.fastp_cmd),
+            "-i", args.r1_in, "-I", args.r2_in,
+            "-o", args.r1_out, "-O", args.r2_out,
+            "-w", args.threads,
+            *shlex.split(args.fastp_params),
+        ]
+    )
 
 
 def step_host_removal(args: argparse.Namespace) -> None:
     if args.mock or not args.host:
-        copy_file(args.r1_in, args.r1_out)
-        copy_file(args.r2_in, args.r2_out)
+        link_or_copy(args.r1_in, args.r1_out)
+        link_or_copy(args.r2_in, args.r2_out)
         return
 
-    cmd = (
-        f"{args.bowtie2_cmd} -x {args.host_index} -1 {args.r1_in} -2 {args.r2_in} "
-        f"--un-conc {args.prefix}.tmp.fq -S {args.prefix}.sam -p {args.threads}"
+    # bowtie2 substitutes the mate number for `%`, so when the outputs differ only
+    # there the unaligned pairs are written in place instead of copied from tmp files.
+    # Only --un-conc is consumed; the alignments themselves are discarded.
+    un_conc = _mate_pattern(args.r1_out, args.r2_out)
+    Path(args.r1_out).parent.mkdir(parents=True, exist_ok=True)
+    run_cmd(
+        [
+            *shlex.split(args.bowtie2_cmd),
+            "-x", args.host_index, "-1", args.r1_in, "-2", args.r2_in,
+            "--un-conc", un_conc or f"{args.prefix}.tmp.%.fq", "-S", os.devnull,
+            "-p", args.threads,
+        ]
     )
-    run_shell(cmd)
-    copy_file(f"{args.prefix}.tmp.fq.1", args.r1_out)
-    copy_file(f"{args.prefix}.tmp.fq.2", args.r2_out)
+    if un_conc is None:
+        move_file(f"{args.prefix}.tmp.1.fq", args.r1_out)
+        move_file(f"{args.prefix}.tmp.2.fq", args.r2_out)
+
+
+def _mate_pattern(r1: str, r2: str) -> str | None:
+    # `<base>_R1.fastq` / `<base>_R2.fastq` -> `<base>_R%.fastq`; None if the pair
+    # cannot be expressed as a single bowtie2 `%` pattern.
+    if "%" in r1 or len(r1) != len(r2):
+        return None
+    diff = [i for i, (a, b) in enumerate(zip(r1, r2)) if a != b]
+    if len(diff) != 1 or (r1[diff[0]], r2[diff[0]]) != ("1", "2"):
+        return None
+    return r1[: diff[0]] + "%" + r1[diff[0] + 1 :]
 
 
 def step_assembly(args: argparse.Namespace) -> None:
@@ -50,12 +86,18 @@ def step_assembly(args: argparse.Namespace) -> None:
         return
 
     temp_dir = out.parent / "megahit_out"
-    cmd = (
-        f"{args.megahit_cmd} -1 {args.input1} -2 {args.input2} "
-        f"-o {temp_dir} -t {args.threads} {args.megahit_params}"
-    ).strip()
-    run_shell(cmd)
-    copy_file(str(temp_dir / "final.contigs.fa"), args.out)
+    # MEGAHIT refuses to start if -o already exists, so a retried job would fail on
+    # its own leftovers; clear them in-process instead of forking `rm -rf`.
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    run_cmd(
+        [
+            *shlex.split(args.megahit_cmd),
+            "-1", args.input1, "-2", args.input2,
+            "-o", temp_dir, "-t", args.threads,
+            *shlex.split(args.megahit_params),
+        ]
+    )
+    move_file(str(temp_dir / "final.contigs.fa"), args.out)
 
 
 def step_vsearch(args: argparse.Namespace) -> None:
@@ -64,8 +106,12 @@ def step_vsearch(args: argparse.Namespace) -> None:
         write_fasta(args.out, kept)
         return
 
-    cmd = f"{args.vsearch_cmd} --sortbylength {args.input} --output {args.out} --minseqlength {args.min_len}"
-    run_shell(cmd)
+    run_cmd(
+        [
+            *shlex.split(args.vsearch_cmd),
+            "--sortbylength", args.input, "--output", args.out, "--minseqlength", args.min_len,
+        ]
+    )
 
 
 def step_detect(args: argparse.Namespace) -> None:
@@ -76,16 +122,25 @@ def step_detect(args: argparse.Namespace) -> None:
         return
 
     if args.tool == "virsorter":
-        cmd = f"{args.tool_cmd} run -i {args.input} -w {args.workdir} -j {args.threads} all"
-        run_shell(cmd)
-        copy_file(str(Path(args.workdir) / "final-viral-combined.fa"), args.out)
+        run_cmd(
+            [
+                *shlex.split(args.tool_cmd),
+                "run", "-i", args.input, "-w", args.workdir, "-j", args.threads, "all",
+            ]
+        )
+        move_file(str(Path(args.workdir) / "final-viral-combined.fa"), args.out)
         return
 
     if args.tool == "genomad":
-        cmd = f"{args.tool_cmd} end-to-end {args.input} {args.workdir} {args.db} -t {args.threads} --splits {args.threads}"
-        run_shell(cmd)
+        run_cmd(
+            [
+                *shlex.split(args.tool_cmd),
+                "end-to-end", args.input, args.workdir, args.db,
+                "-t", args.threads, "--splits", args.threads,
+            ]
+        )
         basename = Path(args.input).stem
-        copy_file(str(Path(args.workdir) / f"{basename}_summary" / f"{basename}_virus.fna"), args.out)
+        move_file(str(Path(args.workdir) / f"{basename}_summary" / f"{basename}_virus.fna"), args.out)
         return
 
     raise ValueError(f"unsupported tool: {args.tool}")
@@ -119,23 +174,43 @@ def step_checkv(args: argparse.Namespace) -> None:
                 fh.write(f"{header}\t{len(seq)}\t{quality}\t{completeness}\n")
         return
 
-    cmd = f"{args.checkv_cmd} end_to_end {args.input} {args.out_dir} -d {args.db} -t {args.threads}"
-    run_shell(cmd)
+    run_cmd(
+        [*shlex.split(args.checkv_cmd), "end_to_end", args.input, args.out_dir, "-d", args.db, "-t", args.threads]
+    )
     copy_file(args.input, str(out_fasta))
     if not out_summary.exists():
         raise RuntimeError(f"CheckV 未生成 quality_summary.tsv: {out_summary}")
 
 
 def step_high_quality(args: argparse.Namespace) -> None:
+    # Real CheckV summaries carry ~14 columns (provirus, gene counts, miuvig_quality,
+    # ...), so look the needed ones up by header name rather than by position.
     keep: set[str] = set()
     with open(args.summary, "r", encoding="utf-8") as fh:
-        next(fh)
+        header = next(fh, "").rstrip("\n").split("\t")
+        try:
+            id_col = header.index("contig_id")
+            quality_col = header.index("checkv_quality")
+        except ValueError:
+            raise RuntimeError(f"CheckV quality_summary.tsv 缺少 contig_id/checkv_quality 列: {args.summary}")
         for line in fh:
-            contig_id, _len, quality, _comp = line.rstrip("\n").split("\t")
-            if quality in {"Complete", "High-quality", "Medium-quality"}:
-                keep.add(contig_id)
-    entries = [(h, s) for h, s in read_fasta(args.input) if h in keep]
-    write_fasta(args.out, entries)
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) > quality_col and fields[quality_col] in {"Complete", "High-quality", "Medium-quality"}:
+                keep.add(fields[id_col])
+    write_fasta_filtered(args.input, args.out, keep_ids=keep)
+
+
+def _find_files(root: Path, names: Tuple[str, ...]) -> Dict[str, Path]:
+    # One os.walk for all wanted names (rglob would re-walk the BUSCO tree per name),
+    # stopping as soon as each has been seen once.
+    wanted = set(names)
+    found: Dict[str, Path] = {}
+    for dirpath, _dirs, files in os.walk(root):
+        for name in wanted.intersection(files):
+            found.setdefault(name, Path(dirpath) / name)
+        if len(found) == len(wanted):
+            break
+    return found
 
 
 def step_busco(args: argparse.Namespace) -> None:
@@ -148,30 +223,42 @@ def step_busco(args: argparse.Namespace) -> None:
     busco_root = out_dir / "_busco"
     busco_root.mkdir(parents=True, exist_ok=True)
 
-    cmd = (
-        f"{args.busco_cmd} -f -i {shlex.quote(args.input)} -c {int(args.threads)} "
-        f"-o busco -m geno -l {shlex.quote(args.busco_db)} --offline --out_path {shlex.quote(str(busco_root))}"
+    run_cmd_cached(
+        [
+            *shlex.split(args.busco_cmd),
+            "-f", "-i", args.input, "-c", int(args.threads),
+            "-o", "busco", "-m", "geno", "-l", args.busco_db, "--offline", "--out_path", busco_root,
+        ],
+        stage="busco",
+        workdir=busco_root,
+        inputs=[args.input],
+        outputs=[busco_root / "busco"],
+        force=args.force,
     )
-    run_shell(cmd)
 
-    predicted = next(busco_root.rglob("predicted.fna"), None)
+    found = _find_files(busco_root, ("predicted.fna", "full_table.tsv"))
+    predicted = found.get("predicted.fna")
     if predicted is None:
         raise RuntimeError(f"BUSCO 输出缺少 predicted.fna（目录: {busco_root}）")
 
-    full_table = next(busco_root.rglob("full_table.tsv"), None)
+    full_table = found.get("full_table.tsv")
     if full_table is None:
         raise RuntimeError(f"BUSCO 输出缺少 full_table.tsv（目录: {busco_root}）")
 
-    gene_counts: Dict[str, int] = {}
-    with predicted.open("r", encoding="utf-8", errors="replace") as fh:
-        for line in fh:
-            if not line.startswith(">"):
+    gene_counts: Counter[str] = Counter()
+    # Only headers matter here: scan in binary so the protein/nucleotide sequence
+    # lines (the bulk of predicted.fna) are never decoded.
+    with predicted.open("rb") as fh:
+        for raw in fh:
+            if not raw.startswith(b">"):
                 continue
-            record = line[1:].strip().split()[0]
-            contig = record.rsplit("_", 1)[0] if "_" in record else record
-            gene_counts[contig] = gene_counts.get(contig, 0) + 1
+            record = raw[1:].split(None, 1)[0].decode("utf-8", errors="replace")
+            # Gene ids are `<contig>_<n>`: slice at the last '_' (no split list per gene).
+            cut = record.rfind("_")
+            contig = record[:cut] if cut >= 0 else record
+            gene_counts[contig] += 1
 
-    busco_counts: Dict[str, int] = {}
+    busco_counts: Counter[str] = Counter()
     with full_table.open("r", encoding="utf-8", errors="replace") as fh:
         for line in fh:
             line = line.rstrip("\n")
@@ -185,15 +272,16 @@ def step_busco(args: argparse.Namespace) -> None:
                 continue
             seq = parts[2].strip().split()[0]
             seq = seq.split(":", 1)[0]
-            contig = seq.rsplit("_", 1)[0] if "_" in seq else seq
-            busco_counts[contig] = busco_counts.get(contig, 0) + 1
+            cut = seq.rfind("_")
+            contig = seq[:cut] if cut >= 0 else seq
+            busco_counts[contig] += 1
 
     threshold = float(args.ratio_threshold)
     to_remove: set[str] = set()
     for contig, total in gene_counts.items():
         if total <= 0:
             continue
-        if (busco_counts.get(contig, 0) / float(total)) > threshold:
+        if (busco_counts[contig] / float(total)) > threshold:
             to_remove.add(contig)
 
     write_fasta_filtered(args.input, args.out, drop_ids=to_remove)
@@ -283,5 +371,6 @@ def register_upstream(subparsers: argparse._SubParsersAction[argparse.ArgumentPa
     parser.add_argument("--busco-cmd", default="busco")
     parser.add_argument("--busco-db", required=True)
     parser.add_argument("--ratio-threshold", type=float, default=0.05)
+    parser.add_argument("--force", action="store_true", help="忽略 _busco 中的 .done.* 缓存，强制重跑 BUSCO")
     parser.add_argument("--mock", action="store_true")
     parser.set_defaults(func=step_busco)
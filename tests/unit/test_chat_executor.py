@@ -1,14 +1,19 @@
 import os
 import sys
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 ROOT = Path(__file__).resolve().parents[2]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+from gmv.chat import session
+from gmv.chat.session import _tail_text
 from gmv.chat.tools import TOOL_SPECS, sanitize_args, tool_risk
+from gmv.config import ConfigError
 
 
 class ChatExecutorTests(unittest.TestCase):
@@ -41,6 +46,34 @@ class ChatExecutorTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             sanitize_args("slurm_squeue", {"user": "bad;rm -rf /"})
 
+    def test_tail_text_keeps_last_lines_within_byte_budget(self):
+        text = "\n".join(f"第{i}行" for i in range(50_000))
+        tail = _tail_text(text, max_lines=3, max_bytes=1000)
+        self.assertEqual(tail.splitlines(), ["第49997行", "第49998行", "第49999行"])
+        self.assertLessEqual(len(_tail_text(text, max_lines=10_000, max_bytes=1000).encode("utf-8")), 1000)
+
+    def test_audit_log_is_closed_when_llm_config_fails(self):
+        closed = []
+        real_close = session._AuditLog.close
+
+        def track_close(log):
+            closed.append(True)
+            real_close(log)
+
+        cfg = ROOT / "tests" / "fixtures" / "minimal" / "config" / "pipeline.yaml"
+        no_mock_env = mock.patch.dict(os.environ, {"GMV_CHAT_MOCK": ""})
+        missing_key = ConfigError("缺少 API key")
+        failing_llm = mock.patch.object(session, "load_llm_config", side_effect=missing_key)
+        tracked_close = mock.patch.object(session._AuditLog, "close", track_close)
+        with tempfile.TemporaryDirectory() as tmp, no_mock_env, failing_llm, tracked_close:
+            self.assertRaises(
+                ConfigError,
+                session.run_chat,
+                config_path=str(cfg), message="hi", auto_approve=False, max_steps=1,
+                log_dir=tmp, base_url=None, model=None, api_key_env=None, llm_config=None,
+            )
+        self.assertEqual(closed, [True])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,5 @@
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -18,6 +19,13 @@ class ConfigSchemaTests(unittest.TestCase):
         self.assertTrue(config["execution"]["mock_mode"])
         self.assertIn("virsorter", config["tools"]["enabled"])
 
+    def test_repeated_load_returns_independent_copies(self):
+        cfg_path = ROOT / "tests" / "fixtures" / "minimal" / "config" / "pipeline.yaml"
+        first = load_pipeline_config(cfg_path)
+        first["execution"]["run_id"] = "mutated"
+        second = load_pipeline_config(cfg_path)
+        self.assertEqual(second["execution"]["run_id"], "test-run")
+
     def test_missing_required_section_raises(self):
         bad_cfg = ROOT / "tests" / "fixtures" / "minimal" / "config" / "bad_missing_execution.yaml"
         bad_cfg.write_text("tools:\n  enabled: {}\n", encoding="utf-8")
@@ -51,6 +59,32 @@ database:
         with self.assertRaises(ConfigError):
             load_pipeline_config(bad_cfg)
 
+    def test_unknown_viruslib_cluster_tool_raises(self):
+        fixture = ROOT / "tests" / "fixtures" / "minimal"
+        with tempfile.TemporaryDirectory() as tmp:
+            bad_cfg = Path(tmp) / "bad_cluster_tool.yaml"
+            bad_cfg.write_text(
+                f"""
+execution:
+  run_id: x
+  profile: local
+  sample_sheet: {fixture / "raw" / "samples.tsv"}
+containers:
+  mapping_file: {fixture / "config" / "containers.yaml"}
+tools:
+  enabled: {{}}
+  params:
+    viruslib_cluster_tool: cd-hit
+database:
+  checkv: {fixture / "db" / "checkv"}
+  busco: {fixture / "db" / "busco"}
+""".strip()
+                + "\n",
+                encoding="utf-8",
+            )
+            with self.assertRaisesRegex(ConfigError, "viruslib_cluster_tool"):
+                load_pipeline_config(bad_cfg)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,92 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from gmv.workflow.steps.common import (
+    copy_file,
+    move_file,
+    run_cmd,
+    run_cmd_cached,
+    write_fasta_filtered,
+)
+
+
+class WorkflowStepsCommonTests(unittest.TestCase):
+    def test_copy_file_creates_parent_and_copies_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "in.fa"
+            src.write_bytes(b">c1\nACGT\n" * 1000)
+            dst = Path(tmp) / "nested" / "out.fa"
+            copy_file(str(src), str(dst))
+            self.assertEqual(dst.read_bytes(), src.read_bytes())
+
+    def test_move_file_renames_into_place(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "workdir" / "final.contigs.fa"
+            src.parent.mkdir()
+            src.write_text(">c1\nACGT\n", encoding="utf-8")
+            dst = Path(tmp) / "out" / "contigs.fa"
+            move_file(str(src), str(dst))
+            self.assertFalse(src.exists())
+            self.assertEqual(dst.read_text(encoding="utf-8"), ">c1\nACGT\n")
+
+    def test_run_cmd_passes_argv_without_shell_and_raises_on_failure(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "dir with space" / "out.txt"
+            out.parent.mkdir()
+            run_cmd([sys.executable, "-c", "import sys; open(sys.argv[1], 'w').write('ok')", out])
+            self.assertEqual(out.read_text(), "ok")
+        with self.assertRaises(RuntimeError):
+            run_cmd([sys.executable, "-c", "raise SystemExit(3)"])
+
+    def test_run_cmd_cached_skips_identical_rerun_until_input_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            inp = Path(tmp) / "in.fa"
+            inp.write_text(">c1\nACGT\n", encoding="utf-8")
+            out = Path(tmp) / "out.txt"
+            argv = [sys.executable, "-c", "import sys; open(sys.argv[1], 'a').write('x')", out]
+            kwargs = {"stage": "append", "workdir": tmp, "inputs": [inp], "outputs": [out]}
+
+            self.assertTrue(run_cmd_cached(argv, **kwargs))
+            self.assertFalse(run_cmd_cached(argv, **kwargs))
+            self.assertTrue(run_cmd_cached(argv, force=True, **kwargs))
+
+            inp.write_text(">c1\nACGTACGT\n", encoding="utf-8")
+            self.assertTrue(run_cmd_cached(argv, **kwargs))
+            self.assertEqual(out.read_text(), "xxx")
+
+    def test_run_cmd_cached_reruns_when_params_change_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            inp = Path(tmp) / "in.fa"
+            inp.write_text(">c1\nACGT\n", encoding="utf-8")
+            out = Path(tmp) / "out.txt"
+            kwargs = {"stage": "write", "workdir": tmp, "inputs": [inp], "outputs": [out]}
+
+            def argv(value):
+                write = "import sys; open(sys.argv[1], 'w').write(sys.argv[2])"
+                return [sys.executable, "-c", write, out, value]
+
+            # A -> B -> A: the outputs on disk are B's, so the third run must not be skipped.
+            self.assertTrue(run_cmd_cached(argv("0.95"), **kwargs))
+            self.assertTrue(run_cmd_cached(argv("0.80"), **kwargs))
+            self.assertTrue(run_cmd_cached(argv("0.95"), **kwargs))
+            self.assertEqual(out.read_text(), "0.95")
+            self.assertFalse(run_cmd_cached(argv("0.95"), **kwargs))
+
+    def test_write_fasta_filtered_keeps_ids_and_normalizes_crlf(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "in.fa"
+            src.write_bytes(b">c1 desc\r\nACGT\r\nAC\r\n>c2\r\nGGCC\r\n")
+            dst = Path(tmp) / "out.fa"
+            write_fasta_filtered(str(src), str(dst), keep_ids={"c1"})
+            self.assertEqual(dst.read_bytes(), b">c1 desc\nACGT\nAC\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,16 @@
+import os
 import sys
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 ROOT = Path(__file__).resolve().parents[2]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from gmv.workflow.steps import build_parser
+from gmv.workflow.steps import build_parser, init_profile, main
 
 
 class WorkflowStepsDispatchTests(unittest.TestCase):
@@ -22,6 +25,27 @@ class WorkflowStepsDispatchTests(unittest.TestCase):
         for step in ("preprocess", "assembly", "downstream", "agent"):
             self.assertIn(step, choices)
 
+    def test_step_profile_env_appends_one_row_per_step(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fasta = Path(tmp) / "in.fa"
+            fasta.write_text(">c1\nACGT\n", encoding="utf-8")
+            profile = Path(tmp) / "step_profile.tsv"
+            argv = ["steps", "combine", "--inputs", str(fasta), "--out", str(Path(tmp) / "out.fa")]
+            with mock.patch.dict(os.environ, {"GMV_STEP_PROFILE": str(profile)}), mock.patch.object(sys, "argv", argv):
+                self.assertEqual(main(), 0)
+                self.assertEqual(main(), 0)
+
+            rows = profile.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(rows[0], "stage\twall_s\tcpu_s\tpeak_rss_gb\tcmd_hash")
+            self.assertEqual([r.split("\t")[0] for r in rows[1:]], ["combine", "combine"])
+
+    def test_init_profile_writes_header_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profile = Path(tmp) / "run" / "step_profile.tsv"
+            init_profile(str(profile))
+            init_profile(str(profile))
+            self.assertEqual(profile.read_text(encoding="utf-8"), "stage\twall_s\tcpu_s\tpeak_rss_gb\tcmd_hash\n")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from gmv.workflow.steps import build_parser
+from gmv.workflow.steps.common import read_fasta, write_fasta
+
+
+class WorkflowStepsProjectTests(unittest.TestCase):
+    def test_viruslib_merge_orders_contigs_longest_first(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Path(tmp) / "a.fa"
+            b = Path(tmp) / "b.fa"
+            write_fasta(str(a), [("a1", "A" * 10), ("a2", "C" * 30)])
+            b.write_text(">b1 desc\n" + "G" * 10 + "\n" + "G" * 10 + "\n>b2\n" + "T" * 30 + "\n", encoding="utf-8")
+            # CRLF input: '\r' must neither reach the output nor count towards the length.
+            c = Path(tmp) / "c.fa"
+            c.write_bytes(b">c1\r\n" + b"ACGT" * 3 + b"\r\n" + b"ACGT" * 3 + b"\r\n")
+            out = Path(tmp) / "all_contigs.fa"
+            inputs = [str(a), str(b), str(c), str(Path(tmp) / "missing.fa")]
+            args = build_parser().parse_args(["viruslib-merge", "--inputs", *inputs, "--out", str(out)])
+            args.func(args)
+            self.assertEqual(
+                read_fasta(str(out)),
+                [
+                    ("vOTU1", "C" * 30),
+                    ("vOTU2", "T" * 30),
+                    ("vOTU3", "ACGT" * 6),
+                    ("vOTU4", "G" * 20),
+                    ("vOTU5", "A" * 10),
+                ],
+            )
+            self.assertNotIn(b"\r", out.read_bytes())
+
+    def test_viruslib_dedup_clusters_only_distinct_sequences(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = Path(tmp) / "fake_mmseqs.py"
+            # Stand-in for `mmseqs easy-linclust`: records its input, every sequence is its own cluster.
+            fake.write_text(
+                "import sys\n"
+                "fasta, prefix = sys.argv[2], sys.argv[3]\n"
+                "ids = [l[1:].split()[0] for l in open(fasta) if l.startswith('>')]\n"
+                "open(prefix + '.seen', 'w').write('\\n'.join(ids))\n"
+                "open(prefix + '.min_seq_id', 'w').write(sys.argv[sys.argv.index('--min-seq-id') + 1])\n"
+                "open(prefix + '_cluster.tsv', 'w').write(''.join(f'{i}\\t{i}\\n' for i in ids))\n",
+                encoding="utf-8",
+            )
+            inp = Path(tmp) / "all_contigs.fa"
+            write_fasta(str(inp), [("vOTU1", "ACGT" * 5), ("vOTU2", "GGCC" * 4), ("vOTU3", "ACGT" * 5)])
+            workdir = Path(tmp) / "work"
+            out = Path(tmp) / "viruslib_nr.fa"
+            clusters = Path(tmp) / "clusters.tsv"
+            args = build_parser().parse_args(
+                [
+                    "viruslib-dedup", "--input", str(inp), "--out", str(out), "--clusters", str(clusters),
+                    "--workdir", str(workdir), "--cluster-tool", "mmseqs",
+                    "--mmseqs-cmd", f"{sys.executable} {fake}", "--ani", "0.9", "--mmseqs-min-seq-id", "0.99",
+                ]
+            )
+            args.func(args)
+
+            self.assertEqual((workdir / "linclust.seen").read_text(), "vOTU1\nvOTU2")
+            self.assertEqual((workdir / "linclust.min_seq_id").read_text(), "0.99")
+            self.assertEqual(
+                clusters.read_text(encoding="utf-8"),
+                "contig\trepresentative\nvOTU1\tvOTU1\nvOTU2\tvOTU2\nvOTU3\tvOTU1\n",
+            )
+            self.assertEqual([h for h, _ in read_fasta(str(out))], ["vOTU1", "vOTU2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
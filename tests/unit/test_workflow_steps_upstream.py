@@ -0,0 +1,121 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from gmv.workflow.steps import build_parser
+from gmv.workflow.steps.common import read_fasta, write_fasta
+
+
+class WorkflowStepsUpstreamTests(unittest.TestCase):
+    def test_high_quality_reads_full_checkv_summary_by_column_name(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            contigs = Path(tmp) / "contigs.fa"
+            write_fasta(str(contigs), [("c1", "ACGT"), ("c2", "GGCC"), ("c3", "TTAA")])
+            summary = Path(tmp) / "quality_summary.tsv"
+            summary.write_text(
+                "contig_id\tcontig_length\tprovirus\tproviral_length\tgene_count\tviral_genes\thost_genes\t"
+                "checkv_quality\tmiuvig_quality\tcompleteness\tcompleteness_method\tcontamination\tkmer_freq\twarnings\n"
+                "c1\t4\tNo\tNA\t1\t1\t0\tHigh-quality\tHigh-quality\t95.0\tAAI-based\t0.0\t1.0\t\n"
+                "c2\t4\tNo\tNA\t1\t0\t0\tLow-quality\tGenome-fragment\t10.0\tAAI-based\t0.0\t1.0\t\n"
+                "c3\t4\tNo\tNA\t1\t1\t0\tComplete\tHigh-quality\t100.0\tDTR\t0.0\t1.0\t\n",
+                encoding="utf-8",
+            )
+            out = Path(tmp) / "hq.fa"
+            args = build_parser().parse_args(
+                ["high-quality", "--input", str(contigs), "--summary", str(summary), "--out", str(out)]
+            )
+            args.func(args)
+            self.assertEqual([h for h, _ in read_fasta(str(out))], ["c1", "c3"])
+
+    def test_host_removal_writes_unaligned_pairs_to_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = Path(tmp) / "fake_bowtie2.py"
+            # Stand-in for bowtie2: "unaligned" mates are the inputs, written to the
+            # --un-conc path with `%` replaced by the mate number.
+            fake.write_text(
+                "import os, shutil, sys\n"
+                "a = sys.argv[1:]\n"
+                "assert a[a.index('-S') + 1] == os.devnull\n"
+                "pattern = a[a.index('--un-conc') + 1]\n"
+                "shutil.copyfile(a[a.index('-1') + 1], pattern.replace('%', '1'))\n"
+                "shutil.copyfile(a[a.index('-2') + 1], pattern.replace('%', '2'))\n",
+                encoding="utf-8",
+            )
+            r1_in = Path(tmp) / "in_R1.fastq"
+            r2_in = Path(tmp) / "in_R2.fastq"
+            r1_in.write_text("@r/1\nACGT\n+\nIIII\n", encoding="utf-8")
+            r2_in.write_text("@r/2\nTTGG\n+\nIIII\n", encoding="utf-8")
+            out_dir = Path(tmp) / "2.host_removed"
+            r1_out = out_dir / "S1_R1.fastq"
+            r2_out = out_dir / "S1_R2.fastq"
+            args = build_parser().parse_args(
+                [
+                    "host-removal", "--r1-in", str(r1_in), "--r2-in", str(r2_in),
+                    "--r1-out", str(r1_out), "--r2-out", str(r2_out), "--prefix", str(out_dir / "S1"),
+                    "--host", "human", "--host-index", "idx", "--bowtie2-cmd", f"{sys.executable} {fake}",
+                ]
+            )
+            args.func(args)
+
+            self.assertEqual(r1_out.read_text(encoding="utf-8"), r1_in.read_text(encoding="utf-8"))
+            self.assertEqual(r2_out.read_text(encoding="utf-8"), r2_in.read_text(encoding="utf-8"))
+            self.assertEqual(sorted(p.name for p in out_dir.iterdir()), ["S1_R1.fastq", "S1_R2.fastq"])
+
+    def test_host_removal_without_host_links_inputs_through(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            r1_in = Path(tmp) / "in_R1.fastq"
+            r2_in = Path(tmp) / "in_R2.fastq"
+            r1_in.write_text("@r/1\nACGT\n+\nIIII\n", encoding="utf-8")
+            r2_in.write_text("@r/2\nTTGG\n+\nIIII\n", encoding="utf-8")
+            r1_out = Path(tmp) / "out" / "S1_R1.fastq"
+            r2_out = Path(tmp) / "out" / "S1_R2.fastq"
+            r1_out.parent.mkdir()
+            r1_out.write_text("stale", encoding="utf-8")
+            args = build_parser().parse_args(
+                [
+                    "host-removal", "--r1-in", str(r1_in), "--r2-in", str(r2_in),
+                    "--r1-out", str(r1_out), "--r2-out", str(r2_out), "--prefix", str(Path(tmp) / "out" / "S1"),
+                ]
+            )
+            args.func(args)
+
+            self.assertEqual(r1_out.read_text(encoding="utf-8"), "@r/1\nACGT\n+\nIIII\n")
+            self.assertTrue(r2_out.samefile(r2_in))
+
+    def test_busco_drops_contigs_dominated_by_busco_genes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = Path(tmp) / "fake_busco.py"
+            # Stand-in for BUSCO: c1 has 2 predicted genes, both BUSCO hits; c_2 has 4, one hit.
+            fake.write_text(
+                "import os, sys\n"
+                "a = sys.argv[1:]\n"
+                "run = os.path.join(a[a.index('--out_path') + 1], a[a.index('-o') + 1], 'run_x')\n"
+                "os.makedirs(run)\n"
+                "open(os.path.join(run, 'predicted.fna'), 'w').write(\n"
+                "    '>c1_1 # 1 # 9\\nATG\\n>c1_2\\nATG\\n' + ''.join(f'>c_2_{i}\\nATG\\n' for i in range(4)))\n"
+                "open(os.path.join(run, 'full_table.tsv'), 'w').write(\n"
+                "    '# BUSCO\\nb1\\tComplete\\tc1_1:1-9\\nb2\\tFragmented\\tc1_2\\n'\n"
+                "    'b3\\tMissing\\nb4\\tComplete\\tc_2_3\\n')\n",
+                encoding="utf-8",
+            )
+            contigs = Path(tmp) / "contigs.fa"
+            write_fasta(str(contigs), [("c1", "ACGT"), ("c_2", "GGCC"), ("c3", "TTAA")])
+            out = Path(tmp) / "11.busco_filter" / "contigs.fa"
+            args = build_parser().parse_args(
+                [
+                    "busco", "--input", str(contigs), "--out", str(out), "--sample", "S1",
+                    "--busco-db", "db", "--ratio-threshold", "0.3", "--busco-cmd", f"{sys.executable} {fake}",
+                ]
+            )
+            args.func(args)
+            self.assertEqual([h for h, _ in read_fasta(str(out))], ["c_2", "c3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,14 +12,14 @@ rule downstream_quant:
     params:
         sample_sheet=str(sample_sheet),
         coverm_cmd=tool_cmd("coverm"),
-        coverm_params=config.get("tools", {}).get("params", {}).get("coverm", ""),
+        coverm_params=TOOL_PARAMS.get("coverm", ""),
     wildcard_constraints:
         method="|".join(DOWNSTREAM_METHODS)
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps downstream "
+            STEP_CMD + " downstream "
             "--samples {params.sample_sheet} --method {wildcards.method} --viruslib {input.viruslib} "
             "--out {output} --threads {threads} "
             "--coverm-cmd \"{params.coverm_cmd}\" --coverm-params \"{params.coverm_params}\" "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
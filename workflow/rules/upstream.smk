@@ -12,13 +12,13 @@ rule preprocess:
         fastp=1
     params:
         fastp_cmd=tool_cmd("fastp"),
-        fastp_params=config.get("tools", {}).get("params", {}).get("fastp", "")
+        fastp_params=TOOL_PARAMS.get("fastp", "")
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps preprocess "
+            STEP_CMD + " preprocess "
             "--r1-in {input.r1} --r2-in {input.r2} --r1-out {output.r1} --r2-out {output.r2} "
             "--threads {threads} --fastp-cmd \"{params.fastp_cmd}\" --fastp-params \"{params.fastp_params}\" "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -36,20 +36,16 @@ rule host_removal:
         bowtie2=1
     params:
         host=lambda wc: host_name(wc.sample),
-        host_index=lambda wc: (
-            str(Path(DB["bowtie2_index"]).resolve() / host_name(wc.sample) / host_name(wc.sample))
-            if host_name(wc.sample)
-            else ""
-        ),
+        host_index=lambda wc: host_index(wc.sample),
         prefix=lambda wc: f"{WORK_ROOT}/{RUN_ID}/upstream/{wc.sample}/2.host_removed/{wc.sample}",
         bowtie2_cmd=tool_cmd("bowtie2")
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps host-removal "
+            STEP_CMD + " host-removal "
             "--r1-in {input.r1} --r2-in {input.r2} --r1-out {output.r1} --r2-out {output.r2} "
             "--host \"{params.host}\" --host-index \"{params.host_index}\" --prefix \"{params.prefix}\" "
             "--threads {threads} --bowtie2-cmd \"{params.bowtie2_cmd}\" "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -68,13 +64,13 @@ rule assembly:
         mode=lambda wc: sample_mode(wc.sample),
         sample=lambda wc: wc.sample,
         megahit_cmd=tool_cmd("megahit"),
-        megahit_params=config.get("tools", {}).get("params", {}).get("megahit", "")
+        megahit_params=TOOL_PARAMS.get("megahit", "")
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps assembly "
+            STEP_CMD + " assembly "
             "--mode {params.mode} --sample {params.sample} --input1 {input.input1} --input2 {input.input2} --out {output.out} "
             "--threads {threads} --megahit-cmd \"{params.megahit_cmd}\" --megahit-params \"{params.megahit_params}\" "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -90,12 +86,12 @@ rule vsearch:
         vsearch=1
     params:
         vsearch_cmd=tool_cmd("vsearch"),
-        vsearch_min_len=config.get("tools", {}).get("params", {}).get("vsearch_min_len", 1500)
+        vsearch_min_len=TOOL_PARAMS.get("vsearch_min_len", 1500)
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps vsearch "
+            STEP_CMD + " vsearch "
             "--input {input} --out {output} --vsearch-cmd \"{params.vsearch_cmd}\" --min-len {params.vsearch_min_len} "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -116,9 +112,9 @@ if TOOLS.get("virsorter", False):
             tool_cmd=tool_cmd("virsorter")
         shell:
             (
-                "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps detect --tool virsorter "
+                STEP_CMD + " detect --tool virsorter "
                 "--tool-cmd \"{params.tool_cmd}\" --db {params.db} --input {input} --workdir {params.wd} --out {output} --threads {threads} "
-                + ("--mock" if MOCK_MODE else "")
+                + MOCK_FLAG
             )
 
 if TOOLS.get("genomad", False):
@@ -138,9 +134,9 @@ if TOOLS.get("genomad", False):
             tool_cmd=tool_cmd("genomad")
         shell:
             (
-                "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps detect --tool genomad "
+                STEP_CMD + " detect --tool genomad "
                 "--tool-cmd \"{params.tool_cmd}\" --db {params.db} --input {input} --workdir {params.wd} --out {output} --threads {threads} "
-                + ("--mock" if MOCK_MODE else "")
+                + MOCK_FLAG
             )
 
 
@@ -155,7 +151,7 @@ rule combine:
         runtime=lambda wc, input, threads: runtime_for("gmv", size_mb=_safe_input_size_mb(input) or RAW_INPUT_MB.get(wc.sample, 0.0)),
         gmv=1
     shell:
-        "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps combine --inputs {input} --out {output}"
+        STEP_CMD + " combine --inputs {input} --out {output}"
 
 
 rule checkv:
@@ -175,9 +171,9 @@ rule checkv:
         checkv_cmd=tool_cmd("checkv")
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps checkv "
+            STEP_CMD + " checkv "
             "--input {input} --out-dir {params.out_dir} --db {params.db} --checkv-cmd \"{params.checkv_cmd}\" --threads {threads} "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -193,7 +189,7 @@ rule high_quality:
         runtime=lambda wc, input, threads: runtime_for("gmv", size_mb=_safe_input_size_mb(input) or RAW_INPUT_MB.get(wc.sample, 0.0)),
         gmv=1
     shell:
-        "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps high-quality --input {input.fasta} --summary {input.summary} --out {output}"
+        STEP_CMD + " high-quality --input {input.fasta} --summary {input.summary} --out {output}"
 
 
 rule busco_filter:
@@ -210,12 +206,12 @@ rule busco_filter:
         sample=lambda wc: wc.sample,
         busco_cmd=tool_cmd("busco"),
         busco_db=str(Path(DB["busco"]).resolve()),
-        ratio_threshold=config.get("tools", {}).get("params", {}).get("busco_ratio_threshold", 0.05),
+        ratio_threshold=TOOL_PARAMS.get("busco_ratio_threshold", 0.05),
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps busco "
+            STEP_CMD + " busco "
             "--input {input} --out {output} --sample {params.sample} --threads {threads} "
             "--busco-cmd \"{params.busco_cmd}\" --busco-db \"{params.busco_db}\" "
             "--ratio-threshold {params.ratio_threshold} "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
@@ -10,7 +10,7 @@ rule viruslib_merge:
         runtime=lambda wc, input, threads: runtime_for("gmv", size_mb=_safe_input_size_mb(input) or TOTAL_READS_MB),
         gmv=1
     shell:
-        "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps viruslib-merge --inputs {input} --out {output}"
+        STEP_CMD + " viruslib-merge --inputs {input} --out {output}"
 
 
 rule viruslib_dedup:
@@ -20,24 +20,32 @@ rule viruslib_dedup:
         fasta=f"{RESULTS_ROOT}/{RUN_ID}/viruslib/viruslib_nr.fa",
         clusters=f"{RESULTS_ROOT}/{RUN_ID}/viruslib/clusters.tsv"
     group: "project"
-    threads: threads_for("vclust")
+    threads: threads_for(CLUSTER_TOOL)
     resources:
-        mem_mb=lambda wc, input, threads: mem_mb_for("vclust", size_mb=_safe_input_size_mb(input) or TOTAL_READS_MB),
-        runtime=lambda wc, input, threads: runtime_for("vclust", size_mb=_safe_input_size_mb(input) or TOTAL_READS_MB),
-        vclust=1
+        mem_mb=lambda wc, input, threads: mem_mb_for(CLUSTER_TOOL, size_mb=_safe_input_size_mb(input) or TOTAL_READS_MB),
+        runtime=lambda wc, input, threads: runtime_for(CLUSTER_TOOL, size_mb=_safe_input_size_mb(input) or TOTAL_READS_MB),
+        # Concurrency unit of the backend that actually runs (`--resources vclust=N` / `mmseqs=N`).
+        **{CLUSTER_TOOL: 1}
     params:
-        workdir=f"{WORK_ROOT}/{RUN_ID}/viruslib/2.vclust/_tmp",
+        workdir=f"{WORK_ROOT}/{RUN_ID}/viruslib/2.{CLUSTER_TOOL}/_tmp",
+        cluster_tool=CLUSTER_TOOL,
         vclust_cmd=tool_cmd("vclust"),
-        min_ident=config.get("tools", {}).get("params", {}).get("vclust_min_ident", 0.95),
-        ani=config.get("tools", {}).get("params", {}).get("vclust_ani", 0.95),
-        qcov=config.get("tools", {}).get("params", {}).get("vclust_qcov", 0.85),
+        mmseqs_cmd=tool_cmd("mmseqs"),
+        min_ident=TOOL_PARAMS.get("vclust_min_ident", 0.95),
+        ani=TOOL_PARAMS.get("vclust_ani", 0.95),
+        qcov=TOOL_PARAMS.get("vclust_qcov", 0.85),
+        # mmseqs identity/coverage are their own knobs; unset, they follow the vclust thresholds.
+        mmseqs_min_seq_id=TOOL_PARAMS.get("mmseqs_min_seq_id", TOOL_PARAMS.get("vclust_ani", 0.95)),
+        mmseqs_coverage=TOOL_PARAMS.get("mmseqs_coverage", TOOL_PARAMS.get("vclust_qcov", 0.85)),
     shell:
         (
-            "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps viruslib-dedup "
+            STEP_CMD + " viruslib-dedup "
             "--input {input} --out {output.fasta} --clusters {output.clusters} "
             "--workdir {params.workdir} --threads {threads} "
+            "--cluster-tool {params.cluster_tool} --mmseqs-cmd \"{params.mmseqs_cmd}\" "
+            "--mmseqs-min-seq-id {params.mmseqs_min_seq_id} --mmseqs-coverage {params.mmseqs_coverage} "
             "--vclust-cmd \"{params.vclust_cmd}\" --min-ident {params.min_ident} --ani {params.ani} --qcov {params.qcov} "
-            + ("--mock" if MOCK_MODE else "")
+            + MOCK_FLAG
         )
 
 
@@ -59,8 +67,8 @@ if TOOLS.get("phabox2", False):
             phabox2_cmd=tool_cmd("phabox2"),
         shell:
             (
-                "PYTHONPATH={GMV_PYTHONPATH} python -m gmv.workflow.steps viruslib-annotate "
+                STEP_CMD + " viruslib-annotate "
                 "--input {input} --out-dir {params.out_dir} --db {params.db} --threads {threads} "
                 "--phabox2-cmd \"{params.phabox2_cmd}\" "
-                + ("--mock" if MOCK_MODE else "")
+                + MOCK_FLAG
             )